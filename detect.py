@@ -6,10 +6,12 @@ Run it and a file picker will open to choose your image.
 
 Requirements:
     pip install ultralytics opencv-python
+    pip install tensorrt            # Optional: faster inference on NVIDIA GPUs
 
 Usage:
-    python detect.py              # Opens file picker to choose image
-    python detect.py image.jpg    # Use specific image file
+    python detect.py                  # Opens file picker to choose images
+    python detect.py image.jpg        # Use specific image file
+    python detect.py a.jpg b.jpg      # Detect several images in one batch
 
 Controls:
     Press any key to close the result window
@@ -17,69 +19,303 @@ Controls:
 Author: Yoshifumi
 """
 
+import importlib.util
+import os
+import shutil
 import sys
 import cv2
+import numpy as np
+import torch
+from concurrent.futures import ThreadPoolExecutor
 from ultralytics import YOLO
 from tkinter import Tk, filedialog
 
 # Hide the main tkinter window
 Tk().withdraw()
 
+# Model files
+MODEL_WEIGHTS = 'yolov8n.pt'
+ENGINE_PATH = 'yolov8n.engine'
+INT8_WEIGHTS = 'yolov8n_int8.pt'  # Temp copy that names the INT8 engine
+INT8_ENGINE_PATH = 'yolov8n_int8.engine'
+INT8_FAILED_PATH = 'yolov8n_int8.failed'  # Stamp left by a failed INT8 build
+CALIB_DATA = 'calib.yaml'  # Dataset yaml pointing at calib/ images
 
-def select_image():
-    """Open a file picker dialog to select an image."""
+# Model input size; larger images are shrunk to this before inference
+IMG_SIZE = 640
+
+# Max images per inference call (matches the engine's export batch size)
+BATCH_SIZE = 8
+
+
+def select_images():
+    """Open a file picker dialog to select one or more images."""
     print("Opening file picker...")
-    file_path = filedialog.askopenfilename(
-        title="Select an image for object detection",
+    file_paths = filedialog.askopenfilenames(
+        title="Select images for object detection",
         filetypes=[
             ("Image files", "*.png *.jpg *.jpeg *.bmp *.gif"),
             ("All files", "*.*")
         ]
     )
-    return file_path
+    return list(file_paths)
 
 
-def detect_image(image_path):
-    """Run object detection on an image."""
-    print(f"\nProcessing: {image_path}")
+def int8_failed_before():
+    """Whether an INT8 build already failed for the current CALIB_DATA."""
+    return (os.path.exists(INT8_FAILED_PATH) and
+            os.path.getmtime(INT8_FAILED_PATH) >= os.path.getmtime(CALIB_DATA))
+
+
+def mark_int8_failed(reason):
+    """Record a failed INT8 build so later runs go straight to FP16."""
+    with open(INT8_FAILED_PATH, 'w') as f:
+        f.write(f"{reason}\n")
+
+
+def build_int8_engine():
+    """Build an INT8 TensorRT engine calibrated on the images in CALIB_DATA.
+
+    Returns the engine path, or None if calibration is not possible. A failed
+    build is not retried until CALIB_DATA is modified.
+    """
+    if not os.path.exists(CALIB_DATA):
+        return None
+    if int8_failed_before():
+        print(f"Skipping INT8: it failed before (see {INT8_FAILED_PATH}); "
+              f"update {CALIB_DATA} to retry")
+        return None
+    try:
+        print("Calibrating INT8 TensorRT engine (may take several minutes)...")
+        # Export writes <weights stem>.engine, so export from a copy named
+        # after the INT8 engine to leave a cached FP16 engine untouched
+        shutil.copyfile(MODEL_WEIGHTS, INT8_WEIGHTS)
+        YOLO(INT8_WEIGHTS).export(
+            format='engine', imgsz=IMG_SIZE, int8=True, data=CALIB_DATA,
+            device=0, dynamic=True, batch=BATCH_SIZE
+        )
+        return INT8_ENGINE_PATH
+    except Exception as e:
+        print(f"INT8 calibration failed, falling back to FP16: {e}")
+        mark_int8_failed(e)
+        return None
+    finally:
+        if os.path.exists(INT8_WEIGHTS):
+            os.remove(INT8_WEIGHTS)
+
+
+def build_fp16_engine():
+    """Build an FP16 TensorRT engine. Returns the engine path, or None."""
+    try:
+        print("Building TensorRT engine (may take several minutes)...")
+        return YOLO(MODEL_WEIGHTS).export(
+            format='engine', imgsz=IMG_SIZE, half=True, device=0,
+            dynamic=True, batch=BATCH_SIZE
+        )
+    except Exception as e:
+        print(f"TensorRT export failed, using PyTorch model: {e}")
+        return None
+
+
+def tensorrt_available():
+    """Check for TensorRT without importing it.
+
+    Ultralytics' engine export pip-installs TensorRT when it is missing,
+    so only export when it is already installed.
+    """
+    return importlib.util.find_spec('tensorrt') is not None
+
+
+def load_engine(path, fallback):
+    """Load a TensorRT engine, or return None if it can't run here.
+
+    Engines are only deserialized on the first prediction, so run one blank
+    image through it now; an engine built on another GPU fails here instead
+    of in the middle of a run.
+    """
+    try:
+        model = YOLO(path, task='detect')
+        blank = np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        model.predict(blank, imgsz=IMG_SIZE, verbose=False)
+        return model
+    except Exception as e:
+        print(f"Could not load {path}, {fallback}: {e}")
+        return None
+
+
+def shrink_image(img):
+    """Downscale an image so its longest side is at most IMG_SIZE."""
+    h, w = img.shape[:2]
+    r = IMG_SIZE / max(h, w)
+    if r < 1:
+        size = (max(1, round(w * r)), max(1, round(h * r)))
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def restore_scale(result, original):
+    """Map a result from a shrunk image back onto the original image."""
+    h, w = original.shape[:2]
+    small_h, small_w = result.orig_shape
+    if (h, w) == (small_h, small_w):
+        return
+
+    boxes = result.boxes.data.clone()
+    boxes[:, [0, 2]] *= w / small_w
+    boxes[:, [1, 3]] *= h / small_h
+    result.orig_img = original
+    result.orig_shape = (h, w)
+    result.update(boxes=boxes)
 
+
+def load_model():
+    """Load the YOLO model, using a TensorRT engine when a GPU is available.
+
+    Prefers an INT8 engine (needs a calibration set), then FP16. Engines are
+    built once from the PyTorch weights and cached on disk, so only the
+    first run on a new GPU pays the export cost.
+    """
+    if torch.cuda.is_available() and tensorrt_available():
+        # Try INT8 first, so it is built once calib.yaml is added even if
+        # an FP16 engine is already cached
+        for path, build, fallback in (
+                (INT8_ENGINE_PATH, build_int8_engine, 'using the FP16 engine'),
+                (ENGINE_PATH, build_fp16_engine, 'using the PyTorch model')):
+            if os.path.exists(path):
+                model = load_engine(path, 'rebuilding it')
+                if model:
+                    return model
+                # Built on another GPU or TensorRT version; rebuild it once
+                os.remove(path)
+
+            engine = build()
+            model = engine and load_engine(engine, fallback)
+            if model:
+                return model
+            if engine == INT8_ENGINE_PATH:
+                mark_int8_failed(f"{engine} built but failed to load")
+
+    return YOLO(MODEL_WEIGHTS)
+
+
+def output_paths_for(image_paths):
+    """Name each result detected_<stem>.jpg, adding a counter on collisions."""
+    used = set()
+    output_paths = []
+    for image_path in image_paths:
+        stem = os.path.splitext(os.path.basename(image_path))[0]
+        output_path = f"detected_{stem}.jpg"
+        n = 1
+        while output_path in used:
+            output_path = f"detected_{stem}_{n}.jpg"
+            n += 1
+        used.add(output_path)
+        output_paths.append(output_path)
+    return output_paths
+
+
+def detect_images(image_paths):
+    """Run object detection on a list of images, batching the inference."""
     # Load YOLO model
     print("Loading YOLO model...")
-    model = YOLO('yolov8n.pt')
+    model = load_model()
     print("Model loaded!")
 
-    # Read image
-    img = cv2.imread(image_path)
-    if img is None:
-        print(f"Error: Could not read image: {image_path}")
-        return
+    # Class id -> name lookup table, indexed once per image
+    class_names = np.array([model.names[i] for i in range(len(model.names))])
+
+    # Result files are encoded in the background while the window is shown
+    jobs = list(zip(image_paths, output_paths_for(image_paths)))
+    saves = []
+    with ThreadPoolExecutor(max_workers=2) as io_pool:
+        for i in range(0, len(jobs), BATCH_SIZE):
+            saves.extend(detect_batch(model, class_names,
+                                      jobs[i:i + BATCH_SIZE], io_pool))
+
+    # Report each file only once its write has finished
+    print()
+    for output_path, future in saves:
+        try:
+            saved = future.result()
+        except Exception as e:
+            print(f"Error: Could not save result {output_path}: {e}")
+            continue
+        if saved:
+            print(f"Result saved: {output_path}")
+        else:
+            print(f"Error: Could not save result: {output_path}")
 
-    # Run detection
-    results = model(img)
+
+def detect_batch(model, class_names, jobs, io_pool):
+    """Run one batched forward pass and handle each result as it streams out.
+
+    Returns (output_path, future) pairs for the pending result writes.
+    """
+    saves = []
+    # Read images
+    loaded, originals, imgs = [], [], []
+    for image_path, output_path in jobs:
+        img = cv2.imread(image_path)
+        if img is None:
+            print(f"Error: Could not read image: {image_path}")
+            continue
+        loaded.append((image_path, output_path))
+        originals.append(img)
+        imgs.append(shrink_image(img))
+
+    if not imgs:
+        return saves
+
+    # The whole list is predicted as one batch
+    results = model.predict(imgs, imgsz=IMG_SIZE, stream=True,
+                            verbose=False)
+    for (image_path, output_path), original, result in zip(
+            loaded, originals, results):
+        # Draw on the full-resolution image, not the shrunk model input
+        restore_scale(result, original)
+        future = show_result(class_names, image_path, output_path, result,
+                             io_pool)
+        saves.append((output_path, future))
+
+    # The predictor keeps the last batch's results (and the full-size images
+    # restore_scale() attached); drop them before the next batch
+    model.predictor.results = None
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+    return saves
+
+
+def show_result(class_names, image_path, output_path, result, io_pool):
+    """Print, save and display the detections for one image.
+
+    The result file is written in the background; returns the write's future.
+    """
+    print(f"\nProcessing: {image_path}")
 
     # Print results
     print("\n" + "=" * 40)
     print("  Detection Results")
     print("=" * 40)
 
-    for box in results[0].boxes:
-        class_id = int(box.cls[0])
-        confidence = float(box.conf[0])
-        name = model.names[class_id]
+    # One device-to-host copy per image instead of one per box
+    names = class_names[result.boxes.cls.cpu().numpy().astype(int)]
+    confidences = result.boxes.conf.cpu().numpy()
+    for name, confidence in zip(names, confidences):
         print(f"  - {name}: {confidence:.1%}")
 
-    if len(results[0].boxes) == 0:
+    if len(result.boxes) == 0:
         print("  No objects detected")
 
     print("=" * 40)
 
     # Draw bounding boxes
-    annotated = results[0].plot()
+    annotated = result.plot()
 
     # Save result
-    output_path = 'detected_result.jpg'
-    cv2.imwrite(output_path, annotated)
-    print(f"\nResult saved: {output_path}")
+    # Always JPEG: much faster to encode than PNG and fine for a preview
+    future = io_pool.submit(cv2.imwrite, output_path, annotated,
+                            [cv2.IMWRITE_JPEG_QUALITY, 85])
 
     # Show result window
     cv2.imshow('Detection Result - Press any key to close', annotated)
@@ -87,6 +323,8 @@ def detect_image(image_path):
     cv2.waitKey(0)
     cv2.destroyAllWindows()
 
+    return future
+
 
 def main():
     print("=" * 40)
@@ -95,14 +333,14 @@ def main():
     print("=" * 40)
 
     if len(sys.argv) > 1:
-        # Image path provided as argument
-        image_path = sys.argv[1]
+        # Image paths provided as arguments
+        image_paths = sys.argv[1:]
     else:
         # Open file picker
-        image_path = select_image()
+        image_paths = select_images()
 
-    if image_path:
-        detect_image(image_path)
+    if image_paths:
+        detect_images(image_paths)
     else:
         print("No image selected. Exiting.")
 